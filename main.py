@@ -6,38 +6,98 @@ competencies using SQLite.
 import sqlite3
 import hashlib
 import json
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from contextlib import contextmanager
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 import random
-import string
 
 
 class DatabaseManager:
     """Main class demonstrating all database management requirements"""
 
-    def __init__(self, db_name: str = "showcase.db"):
+    def __init__(self, db_name: str = "showcase.db", buffer_audit: bool = False):
         self.db_name = db_name
+        # When set, audit events are collected here and written in one batch by flush_audit().
+        # Trade-off: buffered events not yet flushed are lost if the process crashes.
+        self.audit_buffer: Optional[List[Tuple]] = [] if buffer_audit else None
+        # Per-user order summaries, invalidated whenever that user's orders change
+        self._summary_cache: Dict[int, Dict] = {}
+        # One long-lived connection keeps the page and schema caches warm between calls.
+        # Autocommit mode: multi-statement writes use explicit BEGIN/COMMIT.
+        self._conn = sqlite3.connect(db_name, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._apply_connection_pragmas(self._conn)
+        self._lock = threading.RLock()
         self.setup_database()
 
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Context manager granting exclusive use of the shared connection"""
+        with self._lock:
+            try:
+                yield self._conn
+            except Exception:
+                # Never leave a half-finished transaction on the shared connection
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                raise
+
+    def close(self):
+        """Flush buffered audit events and close the shared database connection"""
+        with self._lock:
+            self.flush_audit()
+            self._conn.close()
+
+    def clear_caches(self):
+        """Drop all memoized query results"""
+        self._summary_cache.clear()
+
+    @staticmethod
+    def _audit_timestamp() -> str:
+        """Current UTC time in the same format as SQLite's CURRENT_TIMESTAMP"""
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def flush_audit(self) -> int:
+        """Write all buffered audit events in a single transaction"""
+        with self.get_connection() as conn:
+            # Snapshot and trim under the lock so events appended concurrently are never dropped
+            if not self.audit_buffer:
+                return 0
+            batch = self.audit_buffer[:]
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO audit_log (table_name, action, user_id, timestamp, details) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+            conn.commit()
+            del self.audit_buffer[:len(batch)]
+        return len(batch)
+
+    @staticmethod
+    def _apply_connection_pragmas(conn: sqlite3.Connection):
+        """Apply per-connection tuning PRAGMAs (these are not persisted in the file)"""
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -64000")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        conn.execute("PRAGMA foreign_keys = ON")
 
     def setup_database(self):
         """Initialize database with complete schema"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            # WAL journaling is persistent, so it only needs to be enabled once
+            cursor.execute("PRAGMA journal_mode = WAL").fetchone()
+
             # REQ 7: Implement and modify database structure
             # Create tables with proper relationships and constraints
+            # The whole schema is created in a single transaction
             cursor.executescript("""
+                BEGIN IMMEDIATE;
+
                 -- Users table with sensitive data
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -85,6 +145,9 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
                 CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id);
                 CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(order_date);
+                -- Covering index: completed-order aggregation per customer is served from the index alone
+                CREATE INDEX IF NOT EXISTS idx_orders_status_user_amount ON orders(status, user_id, total_amount);
+                DROP INDEX IF EXISTS idx_orders_user_status;
                 CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
                 CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
                 
@@ -97,9 +160,10 @@ class DatabaseManager:
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     details TEXT
                 );
+
+                COMMIT;
             """)
 
-            conn.commit()
             print("Database structure created successfully!")
 
     # REQ 8: Implement database techniques to safeguard sensitive data
@@ -108,6 +172,12 @@ class DatabaseManager:
         """Hash passwords using SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
 
+    @staticmethod
+    def _hash_passwords_batch(passwords: List[str]) -> List[str]:
+        """Hash many passwords with SHA-256 in one tight loop"""
+        sha256 = hashlib.sha256
+        return [sha256(password.encode()).hexdigest() for password in passwords]
+
     def create_user_secure(self, username: str, email: str, password: str) -> int:
         """Create user with hashed password (security technique)"""
         with self.get_connection() as conn:
@@ -120,43 +190,79 @@ class DatabaseManager:
             conn.commit()
             return cursor.lastrowid
 
+    def create_users_bulk(self, entries: List[Tuple[str, str, str]]) -> List[int]:
+        """Create many (username, email, password) users with hashed passwords in one transaction"""
+        password_hashes = self._hash_passwords_batch([password for _, _, password in entries])
+        rows = [(username, email, password_hash)
+                for (username, email, _), password_hash in zip(entries, password_hashes)]
+        with self.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+                rows
+            )
+            # Under the write lock AUTOINCREMENT hands out consecutive ids ending at the last insert
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.commit()
+        return list(range(last_id - len(rows) + 1, last_id + 1)) if rows else []
+
     # REQ 3: Generate dummy database data for testing and development
     def generate_dummy_data(self, num_users: int = 50, num_products: int = 100):
         """Generate realistic test data"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            # Run the whole load in one transaction so SQLite syncs once
+            conn.execute("BEGIN")
+
+            # Drop secondary indexes during the load and rebuild each in one pass afterwards.
+            # users indexes stay in place since they back the username/email lookups.
+            cursor.execute("""
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'index' AND sql IS NOT NULL
+                  AND tbl_name IN ('products', 'orders', 'order_items')
+            """)
+            secondary_indexes = cursor.fetchall()
+            for index_name, _ in secondary_indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
             # Clear existing data
             cursor.execute("DELETE FROM order_items")
             cursor.execute("DELETE FROM orders")
             cursor.execute("DELETE FROM products")
             cursor.execute("DELETE FROM users")
-            conn.commit()
 
             # Generate users
+            # Categorical and integer columns are drawn per column in one batch (random.choices
+            # with k=...) rather than one interpreter-level call per row. The stdlib has no batch
+            # uniform draw, so prices still take one random.uniform call per product.
             categories = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
             statuses = ['active', 'inactive', 'suspended']
 
+            user_statuses = random.choices(statuses, k=num_users)
+            password_hashes = self._hash_passwords_batch([f"password{i}" for i in range(num_users)])
+            users = []
             for i in range(num_users):
-                username = f"user_{i}_{self._random_string(5)}"
+                username = f"user_{i}"
                 email = f"{username}@example.com"
-                password_hash = self.hash_password(f"password{i}")
-                status = random.choice(statuses)
-                cursor.execute(
-                    "INSERT INTO users (username, email, password_hash, status) VALUES (?, ?, ?, ?)",
-                    (username, email, password_hash, status)
-                )
+                users.append((username, email, password_hashes[i], user_statuses[i]))
+            cursor.executemany(
+                "INSERT INTO users (username, email, password_hash, status) VALUES (?, ?, ?, ?)",
+                users
+            )
 
             # Generate products
-            for i in range(num_products):
-                name = f"Product_{i}_{self._random_string(4)}"
-                category = random.choice(categories)
-                price = round(random.uniform(10, 1000), 2)
-                stock = random.randint(0, 500)
-                cursor.execute(
-                    "INSERT INTO products (name, category, price, stock) VALUES (?, ?, ?, ?)",
-                    (name, category, price, stock)
-                )
+            product_categories = random.choices(categories, k=num_products)
+            prices = [round(random.uniform(10, 1000), 2) for _ in range(num_products)]
+            stocks = random.choices(range(501), k=num_products)
+            products = [
+                (f"Product_{i}", category, price, stock)
+                for i, (category, price, stock) in enumerate(zip(product_categories, prices, stocks))
+            ]
+            cursor.executemany(
+                "INSERT INTO products (name, category, price, stock) VALUES (?, ?, ?, ?)",
+                products
+            )
 
             # Generate orders
             cursor.execute("SELECT id FROM users WHERE status = 'active'")
@@ -165,72 +271,139 @@ class DatabaseManager:
             cursor.execute("SELECT id, price FROM products")
             products = cursor.fetchall()
 
-            for _ in range(200):
-                user_id = random.choice(user_ids)
-                order_date = datetime.now() - timedelta(days=random.randint(0, 365))
+            num_orders = 200
+            orders, order_items = self._sample_orders(user_ids, products, num_orders)
 
-                # Insert order
-                cursor.execute(
-                    "INSERT INTO orders (user_id, total_amount, order_date, status) VALUES (?, ?, ?, ?)",
-                    (user_id, 0, order_date, random.choice(['pending', 'completed', 'cancelled']))
-                )
-                order_id = cursor.lastrowid
-
-                # Insert order items
-                total = 0
-                for _ in range(random.randint(1, 5)):
-                    product = random.choice(products)
-                    quantity = random.randint(1, 5)
-                    item_total = product[1] * quantity
-                    total += item_total
+            # Insert order headers, mapping each sampled order index to its row id
+            order_ids = self._insert_orders(cursor, orders)
 
-                    cursor.execute(
-                        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
-                        (order_id, product[0], quantity, product[1])
-                    )
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                [(order_ids[order_idx], product_id, quantity, price)
+                 for order_idx, product_id, quantity, price in order_items]
+            )
 
-                # Update order total
-                cursor.execute("UPDATE orders SET total_amount = ? WHERE id = ?", (total, order_id))
+            # Rebuild indexes and refresh planner statistics
+            for _, index_sql in secondary_indexes:
+                cursor.execute(index_sql)
+            cursor.execute("ANALYZE")
 
             conn.commit()
-            print(f"✓ Generated {num_users} users, {num_products} products, and 200 orders.")
+            self.clear_caches()
+            print(f"✓ Generated {num_users} users, {num_products} products, and {num_orders} orders.")
+
+    @staticmethod
+    def _insert_orders(cursor: sqlite3.Cursor, orders: List[Tuple], batch_size: int = 500) -> List[int]:
+        """Insert (user_id, total_amount, order_date, status) rows and return their ids in input order"""
+        sql = "INSERT INTO orders (user_id, total_amount, order_date, status) VALUES "
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            # No RETURNING support: one round trip per order
+            order_ids = []
+            for order in orders:
+                cursor.execute(sql + "(?, ?, ?, ?)", order)
+                order_ids.append(cursor.lastrowid)
+            return order_ids
+
+        order_ids = []
+        for start in range(0, len(orders), batch_size):
+            batch = orders[start:start + batch_size]
+            cursor.execute(
+                sql + ", ".join(["(?, ?, ?, ?)"] * len(batch)) + " RETURNING id",
+                [value for order in batch for value in order]
+            )
+            # RETURNING order is unspecified, but AUTOINCREMENT ids follow VALUES order
+            order_ids.extend(sorted(row[0] for row in cursor.fetchall()))
+        return order_ids
+
+    @staticmethod
+    def _sample_orders(user_ids: List[int], products: List, num_orders: int,
+                       max_items: int = 5) -> Tuple[List[Tuple], List[Tuple]]:
+        """Sample order headers and their items without touching the database.
+
+        Returns (orders, items): orders as (user_id, total_amount, order_date, status)
+        tuples, items as flat (order_index, product_id, quantity, price) tuples.
+        """
+        now = datetime.now()
+        order_users = random.choices(user_ids, k=num_orders)
+        order_days = random.choices(range(366), k=num_orders)
+        order_statuses = random.choices(['pending', 'completed', 'cancelled'], k=num_orders)
+        item_counts = random.choices(range(1, max_items + 1), k=num_orders)
+        num_items = sum(item_counts)
+        item_products = random.choices(products, k=num_items)
+        item_quantities = random.choices(range(1, max_items + 1), k=num_items)
+
+        orders = []
+        items = []
+        offset = 0
+        for order_idx, item_count in enumerate(item_counts):
+            total = 0
+            for product, quantity in zip(item_products[offset:offset + item_count],
+                                         item_quantities[offset:offset + item_count]):
+                total += product[1] * quantity
+                items.append((order_idx, product[0], quantity, product[1]))
+            offset += item_count
+
+            orders.append((order_users[order_idx], total,
+                           now - timedelta(days=order_days[order_idx]), order_statuses[order_idx]))
+
+        return orders, items
 
     @staticmethod
-    def _random_string(length: int) -> str:
-        """Helper to generate random strings"""
-        return ''.join(random.choices(string.ascii_lowercase, k=length))
+    def _iter_rows(cursor: sqlite3.Cursor, size: int = 256) -> Iterator[Dict]:
+        """Stream result rows as dicts, fetching `size` rows at a time"""
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield from (dict(row) for row in rows)
+
+    def _fetch_rows(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        """Run a query and return its sqlite3.Row results for internal callers"""
+        with self.get_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _fetch_dicts(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        """Run a query and stream its results into dicts without an intermediate Row list"""
+        with self.get_connection() as conn:
+            return list(self._iter_rows(conn.execute(sql, params)))
 
     # REQ 1: Select data from a database using query language
-    def select_active_users(self) -> List[Dict]:
+    _ACTIVE_USERS_SQL = """
+        SELECT id, username, email, created_at, status
+        FROM users
+        WHERE status = 'active'
+        LIMIT 10
+    """
+
+    def _select_active_users_raw(self) -> List[sqlite3.Row]:
         """Basic SELECT query with WHERE clause"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, username, email, created_at, status
-                FROM users
-                WHERE status = 'active'
-                LIMIT 10
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+        return self._fetch_rows(self._ACTIVE_USERS_SQL)
+
+    def select_active_users(self) -> List[Dict]:
+        """Active users as dicts, streamed from the cursor"""
+        return self._fetch_dicts(self._ACTIVE_USERS_SQL)
 
     # REQ 4: Order and group data from a database using query language
-    def get_products_by_category(self) -> List[Dict]:
+    _PRODUCTS_BY_CATEGORY_SQL = """
+        SELECT 
+            category,
+            COUNT(*) as product_count,
+            AVG(price) as avg_price,
+            MIN(price) as min_price,
+            MAX(price) as max_price,
+            SUM(stock) as total_stock
+        FROM products
+        GROUP BY category
+        ORDER BY product_count DESC, avg_price DESC
+    """
+
+    def _get_products_by_category_raw(self) -> List[sqlite3.Row]:
         """GROUP BY with ORDER BY and aggregation"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    category,
-                    COUNT(*) as product_count,
-                    AVG(price) as avg_price,
-                    MIN(price) as min_price,
-                    MAX(price) as max_price,
-                    SUM(stock) as total_stock
-                FROM products
-                GROUP BY category
-                ORDER BY product_count DESC, avg_price DESC
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+        return self._fetch_rows(self._PRODUCTS_BY_CATEGORY_SQL)
+
+    def get_products_by_category(self) -> List[Dict]:
+        """Category statistics as dicts, streamed from the cursor"""
+        return self._fetch_dicts(self._PRODUCTS_BY_CATEGORY_SQL)
 
     # REQ 5: Use database data aggregation techniques
     def get_sales_statistics(self) -> Dict:
@@ -239,22 +412,30 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
-                    COUNT(DISTINCT o.id) as total_orders,
+                    COUNT(*) as total_orders,
                     COUNT(DISTINCT o.user_id) as unique_customers,
                     SUM(o.total_amount) as total_revenue,
                     AVG(o.total_amount) as avg_order_value,
                     MIN(o.total_amount) as min_order,
-                    MAX(o.total_amount) as max_order,
-                    COUNT(CASE WHEN o.status = 'completed' THEN 1 END) as completed_orders,
-                    COUNT(CASE WHEN o.status = 'pending' THEN 1 END) as pending_orders,
-                    COUNT(CASE WHEN o.status = 'cancelled' THEN 1 END) as cancelled_orders
+                    MAX(o.total_amount) as max_order
                 FROM orders o
             """)
-            return dict(cursor.fetchone())
+            stats = dict(cursor.fetchone())
+
+            # Status counts come from one grouped scan of the status-leading index
+            cursor.execute("SELECT status, COUNT(*) FROM orders GROUP BY status")
+            status_counts = dict(cursor.fetchall())
+            for status in ('completed', 'pending', 'cancelled'):
+                stats[f"{status}_orders"] = status_counts.get(status, 0)
+            return stats
 
     # REQ 6: Combine multiple queries to optimize query execution
     def get_user_order_summary(self, user_id: int) -> Dict:
         """Optimized query combining multiple data sources with JOINs"""
+        cached = self._summary_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
             # Single optimized query instead of multiple queries
@@ -275,37 +456,44 @@ class DatabaseManager:
                 GROUP BY u.id, u.username, u.email
             """, (user_id,))
             result = cursor.fetchone()
-            return dict(result) if result else {}
+            if not result:
+                return {}
+            summary = dict(result)
+            self._summary_cache[user_id] = summary
+            return dict(summary)
 
     # REQ 16: Optimize query performance using query techniques
-    def get_top_customers_optimized(self, limit: int = 10) -> List[Dict]:
+    # Using CTE (Common Table Expression) for better query organization
+    _TOP_CUSTOMERS_SQL = """
+        WITH customer_stats AS (
+            SELECT 
+                o.user_id,
+                COUNT(*) as order_count,
+                SUM(o.total_amount) as total_spent
+            FROM orders o
+            WHERE o.status = 'completed'
+            GROUP BY o.user_id
+        )
+        SELECT 
+            u.id,
+            u.username,
+            u.email,
+            cs.order_count,
+            cs.total_spent
+        FROM users u
+        INNER JOIN customer_stats cs ON u.id = cs.user_id
+        WHERE u.status = 'active'
+        ORDER BY cs.total_spent DESC
+        LIMIT ?
+    """
+
+    def _get_top_customers_optimized_raw(self, limit: int = 10) -> List[sqlite3.Row]:
         """Optimized query using indexes, CTEs, and efficient joins"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            # Using CTE (Common Table Expression) for better query organization
-            cursor.execute("""
-                WITH customer_stats AS (
-                    SELECT 
-                        o.user_id,
-                        COUNT(*) as order_count,
-                        SUM(o.total_amount) as total_spent
-                    FROM orders o
-                    WHERE o.status = 'completed'
-                    GROUP BY o.user_id
-                )
-                SELECT 
-                    u.id,
-                    u.username,
-                    u.email,
-                    cs.order_count,
-                    cs.total_spent
-                FROM users u
-                INNER JOIN customer_stats cs ON u.id = cs.user_id
-                WHERE u.status = 'active'
-                ORDER BY cs.total_spent DESC
-                LIMIT ?
-            """, (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+        return self._fetch_rows(self._TOP_CUSTOMERS_SQL, (limit,))
+
+    def get_top_customers_optimized(self, limit: int = 10) -> List[Dict]:
+        """Top customers as dicts, streamed from the cursor"""
+        return self._fetch_dicts(self._TOP_CUSTOMERS_SQL, (limit,))
 
     # REQ 2: Create and modify database objects
     def modify_database_structure(self):
@@ -353,19 +541,23 @@ class DatabaseManager:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
-            # Audit trigger for user changes
-            cursor.execute("""
-                CREATE TRIGGER IF NOT EXISTS audit_user_changes
+            # All triggers are created in one script and one transaction
+            cursor.executescript("""
+                BEGIN IMMEDIATE;
+
+                -- Audit trigger for user changes; only real status changes are logged.
+                -- Recreated so databases carrying the older ungated version pick up the WHEN clause
+                DROP TRIGGER IF EXISTS audit_user_changes;
+                CREATE TRIGGER audit_user_changes
                 AFTER UPDATE ON users
+                FOR EACH ROW WHEN OLD.status IS NOT NEW.status
                 BEGIN
                     INSERT INTO audit_log (table_name, action, user_id, details)
                     VALUES ('users', 'UPDATE', NEW.id, 
                             json_object('old_status', OLD.status, 'new_status', NEW.status));
                 END;
-            """)
 
-            # Trigger to update product stock
-            cursor.execute("""
+                -- Trigger to update product stock
                 CREATE TRIGGER IF NOT EXISTS update_product_stock
                 AFTER INSERT ON order_items
                 BEGIN
@@ -373,19 +565,18 @@ class DatabaseManager:
                     SET stock = stock - NEW.quantity
                     WHERE id = NEW.product_id AND stock >= NEW.quantity;
                 END;
-            """)
 
-            # Prevent deletion of orders with items
-            cursor.execute("""
+                -- Prevent deletion of orders with items
                 CREATE TRIGGER IF NOT EXISTS prevent_order_deletion
                 BEFORE DELETE ON orders
                 BEGIN
                     SELECT RAISE(ABORT, 'Cannot delete order with items')
                     WHERE (SELECT COUNT(*) FROM order_items WHERE order_id = OLD.id) > 0;
                 END;
+
+                COMMIT;
             """)
 
-            conn.commit()
             print("✓ Created triggers for audit, stock management, and data protection")
 
     # REQ 10: Wrap queries into transactions
@@ -402,14 +593,26 @@ class DatabaseManager:
                 conn.execute("BEGIN TRANSACTION")
                 cursor = conn.cursor()
 
-                # Calculate total
-                total_amount = 0
+                # Sum requested quantities so repeated products are checked against their combined demand
+                requested = {}
                 for item in items:
-                    cursor.execute("SELECT price, stock FROM products WHERE id = ?", (item['product_id'],))
-                    product = cursor.fetchone()
-                    if not product or product[1] < item['quantity']:
-                        raise ValueError(f"Insufficient stock for product {item['product_id']}")
-                    total_amount += product[0] * item['quantity']
+                    requested[item['product_id']] = requested.get(item['product_id'], 0) + item['quantity']
+
+                # Fetch price and stock for every distinct product in one query
+                placeholders = ", ".join("?" * len(requested))
+                cursor.execute(
+                    f"SELECT id, price, stock FROM products WHERE id IN ({placeholders})",
+                    list(requested)
+                )
+                products = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+                # Validate stock and calculate total
+                total_amount = 0
+                for product_id, quantity in requested.items():
+                    product = products.get(product_id)
+                    if not product or product[1] < quantity:
+                        raise ValueError(f"Insufficient stock for product {product_id}")
+                    total_amount += product[0] * quantity
 
                 # Create order
                 cursor.execute(
@@ -419,27 +622,31 @@ class DatabaseManager:
                 order_id = cursor.lastrowid
 
                 # Add items and update stock
-                for item in items:
-                    cursor.execute("SELECT price FROM products WHERE id = ?", (item['product_id'],))
-                    price = cursor.fetchone()[0]
-
-                    cursor.execute(
-                        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
-                        (order_id, item['product_id'], item['quantity'], price)
-                    )
+                cursor.executemany(
+                    "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                    [(order_id, item['product_id'], item['quantity'], products[item['product_id']][0])
+                     for item in items]
+                )
+                cursor.executemany(
+                    "UPDATE products SET stock = stock - ? WHERE id = ?",
+                    [(item['quantity'], item['product_id']) for item in items]
+                )
 
+                # Log transaction (deferred to flush_audit() when buffering)
+                # The event time is captured now so buffered rows keep it rather than the flush time
+                audit_entry = ('orders', 'CREATE', user_id, self._audit_timestamp(),
+                               json.dumps({'order_id': order_id, 'total': total_amount}))
+                if self.audit_buffer is None:
                     cursor.execute(
-                        "UPDATE products SET stock = stock - ? WHERE id = ?",
-                        (item['quantity'], item['product_id'])
+                        "INSERT INTO audit_log (table_name, action, user_id, timestamp, details) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        audit_entry
                     )
 
-                # Log transaction
-                cursor.execute(
-                    "INSERT INTO audit_log (table_name, action, user_id, details) VALUES (?, ?, ?, ?)",
-                    ('orders', 'CREATE', user_id, json.dumps({'order_id': order_id, 'total': total_amount}))
-                )
-
                 conn.commit()
+                self._summary_cache.pop(user_id, None)
+                if self.audit_buffer is not None:
+                    self.audit_buffer.append(audit_entry)
                 print(f"✓ Transaction completed: Order #{order_id} created")
                 return True
 
@@ -496,36 +703,58 @@ class DatabaseManager:
             """)
             plan = cursor.fetchall()
 
-            # 3. Vacuum to reclaim space
-            cursor.execute("VACUUM")
-
-            # 4. Create covering index for common queries
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_orders_user_status 
-                ON orders(user_id, status, total_amount)
-            """)
-
-            conn.commit()
-            print("✓ Optimization techniques applied: ANALYZE, VACUUM, covering indexes")
+            print("✓ Optimization techniques applied: ANALYZE, covering indexes (VACUUM via maintenance())")
             print(f"  Query plan analysis: {len(plan)} steps")
 
-    # REQ 13: Create and use database dumps
-    def create_backup(self, backup_file: str = "backup.sql"):
-        """Create database dump for backup"""
+    def maintenance(self):
+        """Offline maintenance: rewrite the file to reclaim space, then refresh statistics.
+        VACUUM takes an exclusive lock and rewrites the whole database, so keep it off hot paths.
+        """
         with self.get_connection() as conn:
-            with open(backup_file, 'w') as f:
-                for line in conn.iterdump():
-                    f.write(f"{line}\n")
+            conn.execute("VACUUM")
+            conn.execute("ANALYZE")
+        print("✓ Maintenance completed: VACUUM, ANALYZE")
+
+    # REQ 13: Create and use database dumps
+    def create_backup(self, backup_file: str = "backup.db"):
+        """Create binary database backup using SQLite's online backup API"""
+        dest = sqlite3.connect(backup_file)
+        try:
+            with self.get_connection() as conn:
+                conn.backup(dest, pages=1000)
+        finally:
+            dest.close()
         print(f"✓ Database backup created: {backup_file}")
         return backup_file
 
     def restore_from_backup(self, backup_file: str):
-        """Restore database from dump"""
+        """Restore database from a binary backup"""
+        src = sqlite3.connect(backup_file)
+        try:
+            with self.get_connection() as conn:
+                src.backup(conn, pages=1000)
+        finally:
+            src.close()
+        self.clear_caches()
+        print(f"✓ Database restored from: {backup_file}")
+
+    def export_sql(self, dump_file: str = "backup.sql"):
+        """Create SQL text dump for exploration and migration"""
+        with self.get_connection() as conn:
+            with open(dump_file, 'w') as f:
+                for line in conn.iterdump():
+                    f.write(f"{line}\n")
+        print(f"✓ SQL dump created: {dump_file}")
+        return dump_file
+
+    def import_sql(self, dump_file: str):
+        """Load database objects and data from an SQL text dump"""
         with self.get_connection() as conn:
-            with open(backup_file, 'r') as f:
+            with open(dump_file, 'r') as f:
                 sql_script = f.read()
             conn.executescript(sql_script)
-        print(f"✓ Database restored from: {backup_file}")
+        self.clear_caches()
+        print(f"✓ SQL dump imported from: {dump_file}")
 
     # REQ 14: Document information about a database
     def generate_database_documentation(self) -> Dict:
@@ -542,35 +771,31 @@ class DatabaseManager:
                 "triggers": []
             }
 
-            # Get all tables
+            # Get the structure of all tables in one query
             cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name NOT LIKE 'sqlite_%'
+                SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+                FROM sqlite_master m
+                JOIN pragma_table_info(m.name) p
+                WHERE m.type='table' AND m.name NOT LIKE 'sqlite_%'
+                ORDER BY m.rowid, p.cid
             """)
-            tables = cursor.fetchall()
-
-            for (table_name,) in tables:
-                # Get table structure
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-
-                # Get row count
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = cursor.fetchone()[0]
-
-                doc["tables"][table_name] = {
-                    "columns": [
-                        {
-                            "name": col[1],
-                            "type": col[2],
-                            "nullable": not col[3],
-                            "default": col[4],
-                            "primary_key": bool(col[5])
-                        }
-                        for col in columns
-                    ],
-                    "row_count": row_count
-                }
+            for table_name, name, col_type, notnull, default, pk in cursor.fetchall():
+                table = doc["tables"].setdefault(table_name, {"columns": [], "row_count": 0})
+                table["columns"].append({
+                    "name": name,
+                    "type": col_type,
+                    "nullable": not notnull,
+                    "default": default,
+                    "primary_key": bool(pk)
+                })
+
+            # Get row counts of all tables in one query
+            if doc["tables"]:
+                cursor.execute(" UNION ALL ".join(
+                    f"SELECT ?, COUNT(*) FROM \"{table_name}\"" for table_name in doc["tables"]
+                ), list(doc["tables"]))
+                for table_name, row_count in cursor.fetchall():
+                    doc["tables"][table_name]["row_count"] = row_count
 
             # Get indexes
             cursor.execute("""
@@ -638,7 +863,7 @@ def run_demonstration():
     print("\n[1] SELECTING DATA FROM DATABASE")
     print("-" * 80)
     db.generate_dummy_data(50, 100)
-    users = db.select_active_users()
+    users = db._select_active_users_raw()
     print(f"Found {len(users)} active users (showing first 3):")
     for user in users[:3]:
         print(f"  - {user['username']} ({user['email']})")
@@ -653,7 +878,7 @@ def run_demonstration():
 
     print("\n[4] ORDERING AND GROUPING DATA")
     print("-" * 80)
-    categories = db.get_products_by_category()
+    categories = db._get_products_by_category_raw()
     print(f"Product statistics by category (showing first 3):")
     for cat in categories[:3]:
         print(f"  - {cat['category']}: {cat['product_count']} products, avg ${cat['avg_price']:.2f}")
@@ -727,11 +952,16 @@ def run_demonstration():
 
     print("\n[16] QUERY PERFORMANCE OPTIMIZATION")
     print("-" * 80)
-    top_customers = db.get_top_customers_optimized(5)
+    top_customers = db._get_top_customers_optimized_raw(5)
     print(f"Top 5 customers by spending (optimized CTE query):")
     for customer in top_customers[:5]:
         print(f"  - {customer['username']}: ${customer['total_spent']:.2f} ({customer['order_count']} orders)")
 
+    # Offline maintenance runs once, after everything above has been demonstrated
+    print("\n[MAINTENANCE] VACUUM AND ANALYZE")
+    print("-" * 80)
+    db.maintenance()
+
     print("\n" + "="*80)
     print("✓ ALL 16 DATABASE MANAGEMENT REQUIREMENTS DEMONSTRATED")
     print("="*80 + "\n")
@@ -741,6 +971,7 @@ def run_demonstration():
 
 if __name__ == "__main__":
     db_manager = run_demonstration()
+    db_manager.close()
 
     print("\nEVALUATION TALKING POINTS:")
     print("-" * 80)